@@ -6,22 +6,58 @@ Downloads full-resolution images from IIIF manifests embedded in OpenSeadragon v
 """
 
 import argparse
+import asyncio
+import http.client
+import io
 import json
 import logging
 import math
 import os
+import queue
 import re
+import struct
 import sys
+import threading
+import time
+import zlib
+from collections import deque
 from concurrent.futures import ThreadPoolExecutor, as_completed
+from io import BytesIO
 from pathlib import Path
 from typing import List, Dict, Optional, Tuple
 from urllib.parse import urljoin, urlparse
 
+import numpy as np
 import requests
-from bs4 import BeautifulSoup
+import urllib3
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from lxml import etree
+from lxml import html as lxhtml
 from PIL import Image
 from tqdm import tqdm
 
+try:
+    import httpx
+except ImportError:
+    httpx = None
+
+try:
+    # httpx needs h2 for http2=True
+    import h2
+except ImportError:
+    h2 = None
+
+try:
+    from turbojpeg import TurboJPEG, TJPF_RGB
+except ImportError:
+    TurboJPEG = None
+
+try:
+    import requests_cache
+except ImportError:
+    requests_cache = None
+
 
 # Configure logging
 logging.basicConfig(
@@ -30,27 +66,284 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# tileSources: [...] arrays in OpenSeadragon configs, including multiline
+TILE_SOURCES_RE = re.compile(r'tileSources\s*:\s*\[(.*?)\]', re.DOTALL)
+
+# Quoted IIIF URLs (containing info.json)
+INFO_JSON_URL_RE = re.compile(r'["\']([^"\']+info\.json[^"\']*)["\']')
+
+# Pillow save options for each supported output format
+SAVE_OPTIONS = {
+    'png': {'format': 'PNG', 'optimize': False, 'compress_level': 1},
+    'jpg': {'format': 'JPEG', 'quality': 92, 'subsampling': 0},
+    'tiff': {'format': 'TIFF', 'compression': 'tiff_deflate'},
+}
+
+# Number of tile requests written back-to-back on a pipelined connection
+PIPELINE_DEPTH = 16
+
+# Seconds to keep cached info.json responses (tiles are immutable and never expire)
+INFO_JSON_CACHE_TTL = 3600
+
+# Number of images downloaded at the same time from one page
+MAX_CONCURRENT_IMAGES = 4
+
+# Number of info.json files fetched at the same time
+MAX_METADATA_WORKERS = 16
+
+# Number of tile requests in flight at once on the HTTP/2 connection
+HTTP2_BATCH_SIZE = 128
+
+# Initial size of pooled tile response buffers (grown on demand)
+TILE_BUFFER_SIZE = 65536
+
+# Attempts at reading a tile body that breaks off after the headers, and the
+# base delay (doubled on each retry) between them
+TILE_READ_ATTEMPTS = 3
+TILE_READ_BACKOFF = 0.3
+
+# zlib level used for streamed PNG output
+PNG_COMPRESSION_LEVEL = 1
+
+# Rows of tiles a PNG writer may hold in memory awaiting compression or writing
+# (on top of the row being downloaded), regardless of the number of CPU cores
+PNG_MAX_PENDING_BLOCKS = 2
+
+# Smallest piece a row is split into for parallel compression; each piece
+# restarts the deflate window, so much smaller pieces compress worse
+PNG_MIN_BLOCK_SIZE = 128 * 1024
+
+
+class _PipelineSocket:
+    """
+    Socket stand-in that hands every HTTPResponse the same buffered reader.
+
+    http.client normally gives each response its own reader, which would lose
+    any bytes of the next pipelined response that were read ahead.
+    """
+
+    class _Reader(io.BufferedReader):
+        def close(self):
+            # Responses close their reader when done; keep it open for the next one
+            pass
+
+    def __init__(self, sock):
+        self.reader = self._Reader(sock.makefile('rb', buffering=0))
+
+    def makefile(self, mode, *args, **kwargs):
+        return self.reader
+
+
+class _ParallelPNGWriter:
+    """
+    Streams an RGB PNG to disk, deflating blocks of rows on a thread pool.
+
+    Each block is split into pieces that are compressed independently and
+    ended with a sync flush, so the compressed pieces concatenate into one
+    valid zlib stream (the same trick pigz uses). zlib releases the GIL, so
+    pieces compress in parallel on every core.
+    Checksumming and file writes happen in order on a dedicated writer
+    thread, so the caller can carry on downloading the next row meanwhile.
+    """
+
+    def __init__(self, fp, width: int, height: int, level: int = PNG_COMPRESSION_LEVEL,
+                 workers: Optional[int] = None):
+        """
+        Write the PNG header.
+
+        Args:
+            fp: Binary file object to write to
+            width: Image width
+            height: Image height
+            level: zlib compression level
+            workers: Number of compression threads, and the number of pieces
+                each block is split into (default: number of CPU cores)
+        """
+        self.fp = fp
+        self.width = width
+        self.level = level
+        self.workers = workers or os.cpu_count() or 1
+        self._executor = ThreadPoolExecutor(max_workers=self.workers)
+        self._writer = ThreadPoolExecutor(max_workers=1)
+        self._writes = deque()
+        # Bounds how many blocks are held in memory awaiting compression or writing
+        self._slots = threading.BoundedSemaphore(PNG_MAX_PENDING_BLOCKS)
+        self._adler = zlib.adler32(b'')
+
+        fp.write(b'\x89PNG\r\n\x1a\n')
+        self._write_chunk(b'IHDR', struct.pack('>IIBBBBB', width, height, 8, 2, 0, 0, 0))
+        # zlib stream header (deflate, 32K window)
+        self._write_chunk(b'IDAT', b'\x78\x01')
+
+    def _write_chunk(self, chunk_type: bytes, data: bytes):
+        self.fp.write(struct.pack('>I', len(data)))
+        self.fp.write(chunk_type)
+        self.fp.write(data)
+        self.fp.write(struct.pack('>I', zlib.crc32(data, zlib.crc32(chunk_type))))
+
+    @staticmethod
+    def _deflate(raw, level: int) -> bytes:
+        compressor = zlib.compressobj(level, zlib.DEFLATED, -zlib.MAX_WBITS)
+        return compressor.compress(raw) + compressor.flush(zlib.Z_SYNC_FLUSH)
+
+    @staticmethod
+    def scanline_buffer(rows: int, width: int) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Allocate rows in PNG scanline layout, with a pixel view into them.
+
+        Each scanline is a filter-type byte (0, None) followed by interleaved
+        RGB, so pixels written through the view need no repacking before
+        they are deflated.
+
+        Args:
+            rows: Number of rows
+            width: Image width
+
+        Returns:
+            Tuple of (scanlines of shape (rows, width * 3 + 1),
+            pixel view of shape (rows, width, 3))
+        """
+        scanlines = np.zeros((rows, width * 3 + 1), dtype=np.uint8)
+        return scanlines, scanlines[:, 1:].reshape(rows, width, 3)
+
+    def _write_block(self, raw: bytes, pieces: list):
+        try:
+            self._adler = zlib.adler32(raw, self._adler)
+            for piece in pieces:
+                self._write_chunk(b'IDAT', piece.result())
+        finally:
+            self._slots.release()
+
+    def write_scanlines(self, scanlines: np.ndarray):
+        """
+        Queue a block of scanlines for compression and writing.
+
+        The scanlines are copied before returning, so the caller may reuse
+        the buffer straight away.
+
+        Args:
+            scanlines: Rows from scanline_buffer
+        """
+        # Surface any write error from earlier blocks
+        while self._writes and self._writes[0].done():
+            self._writes.popleft().result()
+
+        self._slots.acquire()
+        raw = scanlines.tobytes()
+
+        # The checksum covers the whole block, so pieces may split it anywhere
+        num_pieces = max(1, min(self.workers, len(raw) // PNG_MIN_BLOCK_SIZE))
+        piece_size = math.ceil(len(raw) / num_pieces)
+        view = memoryview(raw)
+        pieces = [self._executor.submit(self._deflate, view[start:start + piece_size], self.level)
+                  for start in range(0, len(raw), piece_size)]
+        self._writes.append(self._writer.submit(self._write_block, raw, pieces))
+
+    def finish(self):
+        """Wait for outstanding blocks and finish the PNG."""
+        while self._writes:
+            self._writes.popleft().result()
+
+        # Empty final deflate block, then the zlib checksum
+        final = zlib.compressobj(self.level, zlib.DEFLATED, -zlib.MAX_WBITS).flush()
+        self._write_chunk(b'IDAT', final + struct.pack('>I', self._adler))
+        self._write_chunk(b'IEND', b'')
+
+    def close(self):
+        """Stop the compression and writer threads, discarding any unwritten blocks."""
+        self._executor.shutdown(wait=False, cancel_futures=True)
+        self._writer.shutdown(cancel_futures=True)
+        self._executor.shutdown()
+
 
 class IIIFImageDownloader:
     """Downloads and composites IIIF tiled images."""
 
-    def __init__(self, output_dir: str = ".", max_workers: int = 10):
+    def __init__(self, output_dir: str = ".", max_workers: int = 10, http2: bool = False,
+                 output_format: str = 'png', cache: bool = False, pipeline: bool = False):
         """
         Initialize the downloader.
 
         Args:
             output_dir: Directory to save output images
             max_workers: Maximum number of concurrent download threads
+            http2: Multiplex tile requests over a single HTTP/2 connection
+            output_format: Output image format ('png', 'jpg' or 'tiff')
+            cache: Keep downloaded tiles in a SQLite cache in the output directory
+            pipeline: Pipeline tile requests on raw HTTP/1.1 keep-alive connections
         """
         self.output_dir = Path(output_dir)
         self.output_dir.mkdir(parents=True, exist_ok=True)
         self.max_workers = max_workers
-        self.session = requests.Session()
+        self.output_format = output_format
+
+        if http2 and (httpx is None or h2 is None):
+            logger.warning("httpx[http2] is not installed; falling back to HTTP/1.1 tile downloads")
+            http2 = False
+        self.http2 = http2
+        self.pipeline = pipeline
+
+        # Response buffers recycled between tile downloads
+        self._buf_pool = queue.LifoQueue()
+
+        # libjpeg-turbo decoder for JPEG tiles, if PyTurboJPEG and its library are available
+        self._tj = None
+        if TurboJPEG is not None:
+            try:
+                self._tj = TurboJPEG()
+            except RuntimeError as e:
+                logger.debug(f"libturbojpeg unavailable, decoding tiles with Pillow: {e}")
+
+        # Idle pipelining connections per (scheme, host), and hosts that refused pipelining
+        self._pipeline_pool = {}
+        self._pipeline_unsupported = set()
+
+        if cache and requests_cache is None:
+            logger.warning("requests-cache is not installed; tiles will not be cached")
+            cache = False
+
+        if cache and (http2 or pipeline):
+            # Only tiles fetched through the session are cached
+            logger.warning("Tiles downloaded over HTTP/2 or pipelining bypass the tile cache")
+
+        if cache:
+            # IIIF tile URLs name an immutable region, so tiles are kept forever;
+            # info.json only briefly, and the page itself not at all
+            self.session = requests_cache.CachedSession(
+                cache_name=str(self.output_dir / '.tilecache'),
+                backend='sqlite',
+                allowable_methods=('GET',),
+                expire_after=requests_cache.DO_NOT_CACHE,
+                urls_expire_after={
+                    '*/info.json': INFO_JSON_CACHE_TTL,
+                    '*/full/0/default.*': requests_cache.NEVER_EXPIRE,
+                }
+            )
+        else:
+            self.session = requests.Session()
         self.session.headers.update({
-            'User-Agent': 'IIIF-Image-Downloader/1.0'
+            'User-Agent': 'IIIF-Image-Downloader/1.0',
+            'Connection': 'keep-alive'
         })
 
-    def fetch_page(self, url: str) -> str:
+        # Share one keep-alive pool per host across all worker threads (of
+        # every image in flight) so tiles reuse connections instead of paying
+        # a TLS handshake each
+        adapter = HTTPAdapter(
+            pool_connections=4,
+            pool_maxsize=max(32, max_workers * MAX_CONCURRENT_IMAGES),
+            pool_block=True,
+            max_retries=Retry(
+                total=5,
+                backoff_factor=0.3,
+                status_forcelist=[429, 500, 502, 503, 504],
+                allowed_methods=['GET']
+            )
+        )
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+
+    def fetch_page(self, url: str) -> bytes:
         """
         Fetch the HTML content of a webpage.
 
@@ -58,50 +351,41 @@ class IIIFImageDownloader:
             url: URL of the webpage
 
         Returns:
-            HTML content as string
+            Raw HTML bytes (lxml works out the encoding itself)
         """
         logger.info(f"Fetching page: {url}")
         response = self.session.get(url, timeout=30)
         response.raise_for_status()
-        return response.text
+        return response.content
 
-    def extract_openseadragon_sources(self, html: str) -> List[str]:
+    def extract_openseadragon_sources(self, html: bytes) -> List[str]:
         """
         Extract IIIF manifest URLs from OpenSeadragon configuration in HTML.
 
         Args:
-            html: HTML content
+            html: Raw HTML bytes
 
         Returns:
             List of IIIF manifest URLs
         """
         logger.info("Extracting OpenSeadragon tileSources...")
 
-        # Parse HTML
-        soup = BeautifulSoup(html, 'html.parser')
-
         # Find all script tags
-        script_tags = soup.find_all('script', type='text/javascript')
+        try:
+            tree = lxhtml.fromstring(html)
+        except etree.ParserError:
+            # Nothing parseable (e.g. an empty page or only a comment)
+            logger.info("Found 0 IIIF manifest(s)")
+            return []
+        script_contents = tree.xpath('//script[@type="text/javascript"]/text()')
 
         tile_sources = []
 
-        for script in script_tags:
-            script_content = script.string
+        for script_content in script_contents:
             if script_content and 'OpenSeadragon' in script_content:
-                # Look for tileSources array
-                # Pattern to match tileSources: [...] including multiline
-                pattern = r'tileSources\s*:\s*\[(.*?)\]'
-                match = re.search(pattern, script_content, re.DOTALL)
-
-                if match:
-                    sources_str = match.group(1)
-                    # Extract URLs (strings in quotes)
-                    url_pattern = r'["\']([^"\']+)["\']'
-                    urls = re.findall(url_pattern, sources_str)
-
-                    # Filter for IIIF URLs (containing info.json)
-                    iiif_urls = [url for url in urls if 'info.json' in url]
-                    tile_sources.extend(iiif_urls)
+                # A script may configure several viewers, so collect every tileSources array
+                for match in TILE_SOURCES_RE.finditer(script_content):
+                    tile_sources.extend(INFO_JSON_URL_RE.findall(match.group(1)))
 
         logger.info(f"Found {len(tile_sources)} IIIF manifest(s)")
         return tile_sources
@@ -137,40 +421,379 @@ class IIIFImageDownloader:
         num_tiles_y = math.ceil(height / tile_size)
         return num_tiles_x, num_tiles_y
 
-    def download_tile(self, url: str) -> Optional[Image.Image]:
+    def download_tile(self, url: str) -> Optional[np.ndarray]:
         """
         Download a single tile.
 
+        Transient failures are retried: the session's Retry policy covers the
+        request up to the response headers, and a body that breaks off
+        mid-read is fetched again up to TILE_READ_ATTEMPTS times. A tile is
+        only given up on once those retries are exhausted, or straight away if
+        the server answers with a permanent error (e.g. a 404) or the tile
+        cannot be decoded.
+
         Args:
             url: URL of the tile
 
         Returns:
-            PIL Image object or None if download fails
+            Decoded tile pixels or None if the tile failed
         """
+        for attempt in range(1, TILE_READ_ATTEMPTS + 1):
+            try:
+                buf = self._buf_pool.get_nowait()
+            except queue.Empty:
+                buf = bytearray(TILE_BUFFER_SIZE)
+
+            try:
+                with self.session.get(url, timeout=30, stream=True) as response:
+                    response.raise_for_status()
+                    response.raw.decode_content = True
+
+                    # Read the body into the pooled buffer, doubling it if the tile is larger
+                    size = 0
+                    while True:
+                        if size == len(buf):
+                            buf.extend(bytes(len(buf)))
+                        with memoryview(buf) as view:
+                            n = response.raw.readinto(view[size:])
+                        if not n:
+                            break
+                        size += n
+                break
+            except (requests.exceptions.RetryError, requests.exceptions.ConnectionError,
+                    requests.exceptions.HTTPError) as e:
+                logger.warning(f"Giving up on tile {url}: {e}")
+                return None
+            except urllib3.exceptions.HTTPError as e:
+                # The body broke off after the headers (reset, truncation, read timeout)
+                if attempt == TILE_READ_ATTEMPTS:
+                    logger.warning(f"Giving up on tile {url}: {e}")
+                    return None
+                logger.debug(f"Reading tile {url} failed, retrying: {e}")
+                time.sleep(TILE_READ_BACKOFF * 2 ** (attempt - 1))
+
+        # Decode now so the buffer can go straight back to the pool
         try:
-            response = self.session.get(url, timeout=30)
-            response.raise_for_status()
-            from io import BytesIO
-            return Image.open(BytesIO(response.content))
-        except Exception as e:
-            logger.warning(f"Failed to download tile {url}: {e}")
+            with memoryview(buf) as view:
+                tile = self.decode_tile(view[:size])
+        except (OSError, ValueError) as e:
+            logger.warning(f"Could not decode tile {url}: {e}")
             return None
 
-    def download_and_composite_image(self, info_url: str, output_filename: str) -> bool:
+        # Only recycle the buffer on success: after a failure the traceback can
+        # still hold a view of it, which would stop the next user resizing it
+        self._buf_pool.put(buf)
+        return tile
+
+    def decode_tile(self, data) -> np.ndarray:
+        """
+        Decode a tile's encoded bytes to a pixel array.
+
+        JPEG tiles are decoded by libjpeg-turbo when available; everything
+        else (or any tile it rejects) is decoded by Pillow.
+
+        Args:
+            data: Encoded image bytes (bytes-like)
+
+        Returns:
+            uint8 array of shape (h, w, 3), or (h, w, 1) for greyscale tiles
+        """
+        if self._tj is not None and bytes(data[:2]) == b'\xff\xd8':
+            try:
+                return self._tj.decode(data, pixel_format=TJPF_RGB)
+            except OSError as e:
+                logger.debug(f"libjpeg-turbo could not decode tile, retrying with Pillow: {e}")
+
+        img = Image.open(BytesIO(data))
+        img.draft('RGB', img.size)
+        img.load()
+        w, h = img.size
+
+        if img.mode == 'L':
+            # Greyscale tiles are broadcast across the three channels when pasted
+            return np.frombuffer(img.tobytes(), dtype=np.uint8).reshape(h, w, 1)
+        if img.mode != 'RGB':
+            img = img.convert('RGB')
+        return np.frombuffer(img.tobytes(), dtype=np.uint8).reshape(h, w, 3)
+
+    def download_tiles_pipelined(self, tile_urls: List[str]) -> List[Optional[np.ndarray]]:
+        """
+        Download tiles by pipelining their GETs on one HTTP/1.1 keep-alive connection.
+
+        All requests are written in one burst and the responses read back in
+        order. If the server closes the connection (or pipelining fails), the
+        remaining tiles are fetched through the regular session instead, as
+        are any tiles that got an error response (so they are retried).
+
+        Args:
+            tile_urls: URLs of the tiles, all on the same host
+
+        Returns:
+            List of decoded tiles (None for failed tiles) in the order of tile_urls
+        """
+        parsed = urlparse(tile_urls[0])
+        key = (parsed.scheme, parsed.netloc)
+
+        if key in self._pipeline_unsupported:
+            return [self.download_tile(url) for url in tile_urls]
+
+        try:
+            conn, sock = self._pipeline_pool.setdefault(key, queue.LifoQueue()).get_nowait()
+        except queue.Empty:
+            conn_class = http.client.HTTPSConnection if parsed.scheme == 'https' else http.client.HTTPConnection
+            conn = conn_class(parsed.netloc, timeout=30)
+            sock = None
+
+        tiles = []
+        refetch = []
+        keep_alive = False
+
+        try:
+            if sock is None:
+                conn.connect()
+                sock = _PipelineSocket(conn.sock)
+
+            # Write every request before reading any response
+            requests_data = []
+            for url in tile_urls:
+                tile = urlparse(url)
+                path = tile.path + (f"?{tile.query}" if tile.query else "")
+                requests_data.append(
+                    f"GET {path} HTTP/1.1\r\n"
+                    f"Host: {parsed.netloc}\r\n"
+                    f"User-Agent: {self.session.headers['User-Agent']}\r\n"
+                    f"Accept-Encoding: identity\r\n"
+                    f"Connection: keep-alive\r\n\r\n"
+                )
+            conn.send(''.join(requests_data).encode('ascii'))
+
+            for url in tile_urls:
+                response = http.client.HTTPResponse(sock, method='GET')
+                response.begin()
+                body = response.read()
+
+                if response.status == 200:
+                    try:
+                        tiles.append(self.decode_tile(body))
+                    except (OSError, ValueError) as e:
+                        logger.warning(f"Could not decode tile {url}: {e}")
+                        tiles.append(None)
+                else:
+                    logger.debug(f"Pipelined tile {url} returned HTTP {response.status}; refetching")
+                    refetch.append(len(tiles))
+                    tiles.append(None)
+
+                if response.will_close:
+                    logger.debug(f"{parsed.netloc} closed the pipelined connection; falling back")
+                    self._pipeline_unsupported.add(key)
+                    break
+            else:
+                keep_alive = True
+        except Exception as e:
+            logger.debug(f"Pipelining to {parsed.netloc} failed: {e}")
+
+        if keep_alive:
+            self._pipeline_pool[key].put((conn, sock))
+        else:
+            conn.close()
+
+        # Anything not answered on the pipeline goes through the session
+        for i in refetch:
+            tiles[i] = self.download_tile(tile_urls[i])
+        tiles.extend(self.download_tile(url) for url in tile_urls[len(tiles):])
+        return tiles
+
+    @staticmethod
+    def paste_tile(canvas: np.ndarray, tile: np.ndarray, pos: Tuple[int, int]):
+        """
+        Copy a tile's pixels straight into the canvas.
+
+        Tiles that overhang the canvas (e.g. a full-size tile returned for an
+        edge region) are cropped to fit, as Image.paste used to do.
+
+        Args:
+            canvas: RGB canvas array of shape (height, width, 3)
+            tile: Pixels from decode_tile
+            pos: (x, y) position of the tile's top-left corner
+        """
+        x, y = pos
+        tile = tile[:canvas.shape[0] - y, :canvas.shape[1] - x]
+        h, w = tile.shape[:2]
+        canvas[y:y + h, x:x + w] = tile
+
+    def create_http2_client(self) -> "httpx.AsyncClient":
+        """
+        Create an async client that multiplexes requests over one HTTP/2 connection.
+
+        Returns:
+            httpx AsyncClient
+        """
+        limits = httpx.Limits(max_connections=1, max_keepalive_connections=1)
+        headers = {'User-Agent': self.session.headers['User-Agent']}
+        return httpx.AsyncClient(http2=True, limits=limits, timeout=30, headers=headers)
+
+    async def download_tiles_http2(self, client: "httpx.AsyncClient", tile_urls: List[str],
+                                   pbar: tqdm) -> List[Optional[np.ndarray]]:
+        """
+        Download tiles concurrently over one multiplexed HTTP/2 connection.
+
+        Tiles that fail on the HTTP/2 connection are refetched through the
+        session, so they get its retry policy. Every fetch in a batch is run to
+        completion before any unexpected error is raised, so nothing is left
+        running on the loop.
+
+        Args:
+            client: Client from create_http2_client
+            tile_urls: URLs of the tiles
+            pbar: Progress bar to advance as each tile completes
+
+        Returns:
+            List of decoded tiles (None for failed tiles) in the order of tile_urls
+        """
+
+        async def fetch(url: str) -> Optional[np.ndarray]:
+            try:
+                response = await client.get(url)
+                response.raise_for_status()
+            except httpx.HTTPError as e:
+                logger.debug(f"HTTP/2 fetch of tile {url} failed, refetching: {e}")
+                return await asyncio.to_thread(self.download_tile, url)
+            finally:
+                pbar.update(1)
+
+            try:
+                return self.decode_tile(response.content)
+            except (OSError, ValueError) as e:
+                logger.warning(f"Could not decode tile {url}: {e}")
+                return None
+
+        tiles = []
+        for start in range(0, len(tile_urls), HTTP2_BATCH_SIZE):
+            batch = tile_urls[start:start + HTTP2_BATCH_SIZE]
+            results = await asyncio.gather(*(fetch(url) for url in batch), return_exceptions=True)
+            for result in results:
+                if isinstance(result, BaseException):
+                    raise result
+            tiles.extend(results)
+
+        return tiles
+
+    def download_tile_row(self, tile_tasks: List[Tuple[str, Tuple[int, int]]],
+                          row_buf: np.ndarray, pbar: tqdm,
+                          loop: Optional[asyncio.AbstractEventLoop] = None,
+                          client: Optional["httpx.AsyncClient"] = None) -> int:
+        """
+        Download one row of tiles into a row buffer.
+
+        Tiles are fetched over HTTP/2 when a client is given, otherwise by worker
+        threads draining a shared queue (in batches of up to PIPELINE_DEPTH
+        when pipelining).
+
+        Args:
+            tile_tasks: (url, (x, y)) for each tile in the row, positioned relative to the row buffer
+            row_buf: RGB buffer of shape (row height, width, 3) to paste into
+            pbar: Progress bar to advance as each tile completes
+            loop: Event loop that owns the HTTP/2 client
+            client: Client from create_http2_client
+
+        Returns:
+            Number of tiles that failed to download
+        """
+        tiles_failed = 0
+
+        if client is not None:
+            # Fetch everything asynchronously, then paste in the calling thread
+            tile_urls = [url for url, _ in tile_tasks]
+            tiles = loop.run_until_complete(self.download_tiles_http2(client, tile_urls, pbar))
+
+            for tile, (_, pos) in zip(tiles, tile_tasks):
+                if tile is not None:
+                    self.paste_tile(row_buf, tile, pos)
+                else:
+                    tiles_failed += 1
+        else:
+            tasks = queue.SimpleQueue()
+            for task in tile_tasks:
+                tasks.put(task)
+
+            # Spread the row across every worker before deepening the pipelines
+            if self.pipeline:
+                batch_size = min(PIPELINE_DEPTH, math.ceil(len(tile_tasks) / self.max_workers))
+            else:
+                batch_size = 1
+            num_workers = min(self.max_workers, math.ceil(len(tile_tasks) / batch_size))
+            failures = [0] * num_workers
+            errors = []
+
+            def worker(i: int):
+                while not errors:
+                    batch = []
+                    try:
+                        while len(batch) < batch_size:
+                            batch.append(tasks.get_nowait())
+                    except queue.Empty:
+                        if not batch:
+                            return
+
+                    try:
+                        if self.pipeline:
+                            tiles = self.download_tiles_pipelined([url for url, _ in batch])
+                        else:
+                            tiles = [self.download_tile(url) for url, _ in batch]
+
+                        for (url, pos), tile in zip(batch, tiles):
+                            # Tiles cover disjoint regions of the buffer, so no lock is needed
+                            if tile is not None:
+                                self.paste_tile(row_buf, tile, pos)
+                            else:
+                                failures[i] += 1
+
+                            pbar.update(1)
+                    except Exception as e:
+                        # Stop every worker and re-raise in the calling thread
+                        errors.append(e)
+                        return
+
+            threads = [threading.Thread(target=worker, args=(i,), daemon=True) for i in range(num_workers)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+
+            if errors:
+                raise errors[0]
+
+            tiles_failed = sum(failures)
+
+        return tiles_failed
+
+    def save_image(self, img: Image.Image, output_path: Path):
+        """
+        Save an image in the configured output format.
+
+        Args:
+            img: Image to save
+            output_path: Destination path
+        """
+        if self.output_format == 'jpg' and img.mode not in ('RGB', 'L'):
+            img = img.convert('RGB')
+        img.save(output_path, **SAVE_OPTIONS[self.output_format])
+
+    def download_and_composite_image(self, info_url: str, metadata: Dict, output_filename: str,
+                                     position: int = 0) -> bool:
         """
         Download all tiles for an image and composite them.
 
         Args:
             info_url: IIIF info.json URL
+            metadata: IIIF metadata already fetched from info_url
             output_filename: Output filename for the composited image
+            position: Line offset of this image's progress bar
 
         Returns:
             True if successful, False otherwise
         """
         try:
-            # Fetch metadata
-            metadata = self.fetch_iiif_metadata(info_url)
-
             # Get image dimensions
             width = metadata['width']
             height = metadata['height']
@@ -195,14 +818,16 @@ class IIIFImageDownloader:
                 logger.info(f"Downloading full image ({width}x{height})...")
                 full_url = f"{base_url}/full/full/0/default.png"
 
-                response = self.session.get(full_url, timeout=120)
-                response.raise_for_status()
-
-                from io import BytesIO
-                img = Image.open(BytesIO(response.content))
+                # Let Pillow read the body straight off the stream rather than
+                # buffering it in requests first
+                with self.session.get(full_url, timeout=120, stream=True) as response:
+                    response.raise_for_status()
+                    response.raw.decode_content = True
+                    img = Image.open(response.raw)
+                    img.load()
 
                 output_path = self.output_dir / output_filename
-                img.save(output_path, 'PNG')
+                self.save_image(img, output_path)
                 logger.info(f"Saved: {output_path}")
                 return True
 
@@ -214,57 +839,92 @@ class IIIFImageDownloader:
 
             logger.info(f"Grid: {num_tiles_x}x{num_tiles_y} tiles ({total_tiles} total)")
 
-            # Create the output image
-            output_image = Image.new('RGB', (width, height), (255, 255, 255))
+            if self.output_format == 'png':
+                # Only one row of tiles is held in memory; each row is handed to
+                # the PNG writer as soon as all of its tiles have arrived, and is
+                # compressed and written while the next row downloads
+                scanlines, row_buf = _ParallelPNGWriter.scanline_buffer(tile_size, width)
+                canvas = None
+            else:
+                # Other formats are encoded by Pillow from the whole canvas
+                row_buf = None
+                canvas = np.empty((height, width, 3), dtype=np.uint8)
 
-            # Download tiles
-            tile_urls = []
-            tile_positions = []
+            tiles_failed = 0
 
-            for ty in range(num_tiles_y):
-                for tx in range(num_tiles_x):
-                    # Calculate region
-                    x = tx * tile_size
-                    y = ty * tile_size
-                    w = min(tile_size, width - x)
-                    h = min(tile_size, height - y)
+            loop = None
+            client = None
 
-                    # IIIF URL format: {base}/{region}/{size}/{rotation}/{quality}.{format}
-                    region = f"{x},{y},{w},{h}"
-                    tile_url = f"{base_url}/{region}/full/0/default.jpg"
+            # IIIF URL format: {base}/{region}/{size}/{rotation}/{quality}.{format}
+            # Only the region's y changes from row to row, and every row but the
+            # last is a full tile_size high (only the last column is narrower),
+            # so the text either side of y is built once per column up front
+            last_h = height - (num_tiles_y - 1) * tile_size
+            heads = []
+            full_tails = []
+            last_tails = []
 
-                    tile_urls.append(tile_url)
-                    tile_positions.append((x, y))
+            for x in range(0, width, tile_size):
+                w = min(tile_size, width - x)
+                heads.append((x, f"{base_url}/{x},"))
+                full_tails.append(f",{w},{tile_size}/full/0/default.jpg")
+                last_tails.append(f",{w},{last_h}/full/0/default.jpg")
 
-            # Download tiles with progress bar
-            tiles_downloaded = 0
-            tiles_failed = 0
+            def tile_rows():
+                nonlocal tiles_failed
 
-            with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
-                future_to_pos = {
-                    executor.submit(self.download_tile, url): (url, pos)
-                    for url, pos in zip(tile_urls, tile_positions)
-                }
+                for ty in range(num_tiles_y):
+                    y = ty * tile_size
+                    if ty < num_tiles_y - 1:
+                        h, tails = tile_size, full_tails
+                    else:
+                        h, tails = last_h, last_tails
 
-                with tqdm(total=total_tiles, desc="Downloading tiles", unit="tile") as pbar:
-                    for future in as_completed(future_to_pos):
-                        url, pos = future_to_pos[future]
-                        tile_img = future.result()
+                    tile_tasks = [(f"{head}{y}{tail}", (x, 0)) for (x, head), tail in zip(heads, tails)]
 
-                        if tile_img:
-                            output_image.paste(tile_img, pos)
-                            tiles_downloaded += 1
-                        else:
-                            tiles_failed += 1
+                    buf = row_buf[:h] if canvas is None else canvas[y:y + h]
 
-                        pbar.update(1)
+                    # White background, so failed tiles leave blank regions
+                    buf.fill(255)
+                    tiles_failed += self.download_tile_row(tile_tasks, buf, pbar, loop, client)
+
+                    yield buf
+
+            output_path = self.output_dir / output_filename
+
+            try:
+                with tqdm(total=total_tiles, desc=f"Downloading {output_filename}", unit="tile",
+                          position=position) as pbar:
+                    if self.http2:
+                        loop = asyncio.new_event_loop()
+                        client = self.create_http2_client()
+
+                    if canvas is None:
+                        with open(output_path, 'wb') as fp:
+                            writer = _ParallelPNGWriter(fp, width, height)
+                            try:
+                                for buf in tile_rows():
+                                    writer.write_scanlines(scanlines[:len(buf)])
+                                writer.finish()
+                            finally:
+                                writer.close()
+                    else:
+                        for _ in tile_rows():
+                            pass
+                        self.save_image(Image.fromarray(canvas), output_path)
+            except Exception:
+                # Don't leave a truncated image behind
+                output_path.unlink(missing_ok=True)
+                raise
+            finally:
+                if loop is not None:
+                    if client is not None:
+                        loop.run_until_complete(client.aclose())
+                    loop.close()
 
             if tiles_failed > 0:
                 logger.warning(f"{tiles_failed} tiles failed to download")
 
-            # Save the composited image
-            output_path = self.output_dir / output_filename
-            output_image.save(output_path, 'PNG')
             logger.info(f"Saved: {output_path}")
 
             return True
@@ -291,18 +951,50 @@ class IIIFImageDownloader:
                 logger.error("No IIIF manifests found in the page")
                 return
 
-            # Download each image
-            for idx, info_url in enumerate(tile_sources, 1):
-                logger.info(f"\nProcessing image {idx}/{len(tile_sources)}")
+            # Fetch every info.json up front so their round trips overlap
+            with ThreadPoolExecutor(max_workers=min(MAX_METADATA_WORKERS, len(tile_sources))) as metadata_executor:
+                metadata_futures = [
+                    metadata_executor.submit(self.fetch_iiif_metadata, info_url)
+                    for info_url in tile_sources
+                ]
+
+            # Download several images at once; their tiles share the session's connection pool
+            tqdm.set_lock(threading.RLock())
+            outer_workers = min(MAX_CONCURRENT_IMAGES, len(tile_sources))
+
+            # Progress bar lines, each held by one image at a time
+            positions = queue.Queue()
+            for position in range(outer_workers):
+                positions.put(position)
+
+            def process_image(idx: int, info_url: str, metadata_future) -> bool:
+                logger.info(f"Processing image {idx}/{len(tile_sources)}")
+
+                try:
+                    metadata = metadata_future.result()
+                except Exception as e:
+                    logger.error(f"Failed to fetch metadata for {info_url}: {e}")
+                    return False
 
                 # Generate output filename
-                output_filename = f"image_{idx:03d}.png"
+                output_filename = f"image_{idx:03d}.{self.output_format}"
 
                 # Download and composite
-                success = self.download_and_composite_image(info_url, output_filename)
+                position = positions.get()
+                try:
+                    return self.download_and_composite_image(info_url, metadata, output_filename, position)
+                finally:
+                    positions.put(position)
+
+            with ThreadPoolExecutor(max_workers=outer_workers) as outer:
+                future_to_idx = {
+                    outer.submit(process_image, idx, info_url, metadata_future): idx
+                    for idx, (info_url, metadata_future) in enumerate(zip(tile_sources, metadata_futures), 1)
+                }
 
-                if not success:
-                    logger.warning(f"Skipping image {idx} due to errors")
+                for future in as_completed(future_to_idx):
+                    if not future.result():
+                        logger.warning(f"Skipping image {future_to_idx[future]} due to errors")
 
             logger.info(f"\nCompleted! Images saved to: {self.output_dir}")
 
@@ -310,6 +1002,14 @@ class IIIFImageDownloader:
             logger.error(f"Error processing URL: {e}")
             sys.exit(1)
 
+        finally:
+            self.session.close()
+
+            for connections in self._pipeline_pool.values():
+                while not connections.empty():
+                    conn, _ = connections.get_nowait()
+                    conn.close()
+
 
 def main():
     """Main entry point."""
@@ -331,6 +1031,30 @@ def main():
         default=10,
         help='Maximum number of concurrent download threads (default: 10)'
     )
+    parser.add_argument(
+        '--format', '-f',
+        choices=sorted(SAVE_OPTIONS),
+        default='png',
+        help='Output image format (default: png)'
+    )
+    parser.add_argument(
+        '--cache',
+        action=argparse.BooleanOptionalAction,
+        default=False,
+        help='Cache downloaded tiles in the output directory so re-runs skip the network '
+             '(requires requests-cache; default: off; not used by --http2 or --pipeline)'
+    )
+    transport = parser.add_mutually_exclusive_group()
+    transport.add_argument(
+        '--http2',
+        action='store_true',
+        help='Multiplex tile downloads over a single HTTP/2 connection (requires httpx[http2])'
+    )
+    transport.add_argument(
+        '--pipeline',
+        action='store_true',
+        help='Pipeline tile requests on HTTP/1.1 keep-alive connections'
+    )
     parser.add_argument(
         '--verbose', '-v',
         action='store_true',
@@ -345,7 +1069,11 @@ def main():
     # Create downloader and process URL
     downloader = IIIFImageDownloader(
         output_dir=args.output,
-        max_workers=args.workers
+        max_workers=args.workers,
+        http2=args.http2,
+        output_format=args.format,
+        cache=args.cache,
+        pipeline=args.pipeline
     )
 
     downloader.process_url(args.url)